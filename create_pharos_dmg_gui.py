@@ -1,36 +1,119 @@
+import argparse
+import gzip
+import json
 import os
 import re
 import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    from OSAKit import OSAScript
+except ImportError:  # PyObjC not installed; fall back to running osascript
+    OSAScript = None
+
+_MFR_RE = re.compile(r"^([A-Z]{2,}(?=[^a-z]|$)|[A-Z][a-z]+|[A-Z][a-zA-Z]+(?=[A-Z]))")
+_GZ_SUFFIX_RE = re.compile(r"\.(?:PPD\.gz|ppd\.gz|gz)$")
+_YESAUTH_RE = re.compile(r"^YesAuth[-_]([^-_]+)[-_](.+)$")
+
+# Bump whenever the layout of data stored with save_cache() changes
+_CACHE_VERSION = 2
+
 
 # === AppleScript Prompt Functions ===
 
+def run_applescript(script):
+    """Run AppleScript source and return its result as text ("" on error or cancel).
+
+    Uses the in-process OSAKit interpreter when PyObjC is available, so the
+    AppleScript component is loaded once for all prompts instead of once per
+    osascript process.
+    """
+    if OSAScript is not None:
+        result, _ = OSAScript.alloc().initWithSource_(script).executeAndReturnError_(None)
+        return (result.stringValue() or "") if result is not None else ""
+    result = subprocess.run(['osascript', '-'], input=script, capture_output=True, text=True)
+    return result.stdout.rstrip("\n")
+
+def applescript_string(text):
+    """Quote text as an AppleScript string literal."""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def applescript_list(items):
+    """Quote items as an AppleScript list of strings."""
+    return "{" + ", ".join(applescript_string(item) for item in items) + "}"
+
 def prompt_with_list(title, prompt, options):
-    """Prompt user with a selectable list via AppleScript."""
-    list_items = "{" + ", ".join([f'\"{item}\"' for item in options]) + "}"
-    script = f'set theList to {list_items}\nchoose from list theList with prompt "{prompt}" with title "{title}"'
-    result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
-    choice = result.stdout.strip().strip('"')
-    return choice if choice.lower() != "false" else None
+    """Prompt user with a selectable list via AppleScript.
+
+    The options are written one per line to a temp file that the script reads
+    back, so the script source stays the same size however long the list is.
+    """
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+        f.write("\n".join(options))
+    script = f'''set theList to paragraphs of (read POSIX file {applescript_string(f.name)} as «class utf8»)
+set choice to choose from list theList with prompt {applescript_string(prompt)} with title {applescript_string(title)}
+if choice is false then return ""
+return item 1 of choice'''
+    try:
+        return run_applescript(script) or None
+    finally:
+        os.remove(f.name)
 
 def prompt_with_list_or_custom(title, prompt, options, custom_label="Other..."):
     """Prompt user with a list, or allow custom text entry."""
     options_with_custom = options + [custom_label]
     choice = prompt_with_list(title, prompt, options_with_custom)
     if choice == custom_label:
-        script = f'display dialog "Enter custom value:" with title "{title}" default answer ""'
-        result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
-        m = re.search(r'text returned:(.*)', result.stdout)
-        return m.group(1).strip() if m else ""
+        script = f'return text returned of (display dialog "Enter custom value:" with title {applescript_string(title)} default answer "")'
+        return run_applescript(script).strip()
     return choice
 
 def prompt_yes_no(title, prompt):
     """Prompt user with a Yes/No dialog via AppleScript."""
-    script = f'display dialog "{prompt}" with title "{title}" buttons {{"No", "Yes"}} default button "No"'
-    result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
-    return "Yes" in result.stdout
+    script = f'return button returned of (display dialog {applescript_string(prompt)} with title {applescript_string(title)} buttons {{"No", "Yes"}} default button "No")'
+    return run_applescript(script) == "Yes"
+
+def show_error_dialog(title, message):
+    """Show an error message in an AppleScript dialog."""
+    script = f'display dialog {applescript_string(message)} with title {applescript_string(title)} buttons {{"OK"}} default button "OK" with icon stop'
+    run_applescript(script)
+
+def prompt_many_with_list_or_custom(prompts, custom_label="Other..."):
+    """Run several list-or-custom prompts in a single AppleScript.
+
+    ``prompts`` is a sequence of (title, prompt, options) tuples. Returns one
+    answer per prompt; once a prompt is cancelled the rest are skipped and
+    their answers are None.
+    """
+    titles = applescript_list(title for title, _, _ in prompts)
+    messages = applescript_list(prompt for _, prompt, _ in prompts)
+    option_lists = "{" + ", ".join(applescript_list(options + [custom_label]) for _, _, options in prompts) + "}"
+    script = f'''set theTitles to {titles}
+set thePrompts to {messages}
+set theLists to {option_lists}
+set answers to {{}}
+repeat with i from 1 to count of theTitles
+    set choice to choose from list (item i of theLists) with prompt (item i of thePrompts) with title (item i of theTitles)
+    if choice is false then exit repeat
+    set choice to item 1 of choice
+    if choice is {applescript_string(custom_label)} then
+        try
+            set choice to text returned of (display dialog "Enter custom value:" with title (item i of theTitles) default answer "")
+        on error number -128
+            set choice to ""
+        end try
+    end if
+    if choice is "" then exit repeat
+    set end of answers to choice
+end repeat
+set AppleScript's text item delimiters to (character id 31)
+return answers as text'''
+    output = run_applescript(script)
+    answers = output.split("\x1f") if output else []
+    return answers + [None] * (len(prompts) - len(answers))
 
 
 # === Helper Functions ===
@@ -43,14 +126,13 @@ def get_first_name(full_name):
     else:
         return full_name.split()[0]
 
-def extract_bare_queue(file_name):
-    """Remove planning unit and .dmg/.DMG from queue name."""
-    name = re.sub(r'\.dmg$', '', file_name, flags=re.IGNORECASE)
-    m = re.match(r"^YesAuth[-_]([^-_]+)[-_](.+)$", name)
+def extract_bare_queue(base_queue):
+    """Remove planning unit from a queue name already stripped of .dmg/.DMG."""
+    m = _YESAUTH_RE.match(base_queue)
     if m:
         return m.group(2)
     else:
-        return name
+        return base_queue
 
 def load_list_from_file(filepath, default=None):
     """Load a list from a text file, or return default."""
@@ -71,19 +153,122 @@ def get_technician_map(technicians):
             tech_map[t] = t
     return tech_map
 
+def scan_ppd_files(resources_dir):
+    """Return {manufacturer: [driver, ...]} for the gzipped PPDs in resources_dir.
+
+    Drivers are PPD filenames without the .gz suffix, sorted by name.
+    """
+    with os.scandir(resources_dir) as it:
+        ppd_files = sorted(e.name for e in it if e.name.endswith(".gz"))
+    by_mfr = {}
+    for f in ppd_files:
+        by_mfr.setdefault(extract_manufacturer(f), []).append(f[:-3])
+    return by_mfr
+
 def extract_manufacturer(filename):
     """Guess manufacturer from PPD filename."""
-    name = filename.replace(".PPD.gz", "").replace(".ppd.gz", "").replace(".gz", "")
-    match = re.match(r"^([A-Z]{2,}(?=[^a-z]|$)|[A-Z][a-z]+|[A-Z][a-zA-Z]+(?=[A-Z]))", name)
+    name = _GZ_SUFFIX_RE.sub("", filename)
+    match = _MFR_RE.match(name)
     return match.group(1) if match else name.split()[0]
 
+def remove_stale_entries(directory, keep):
+    """Delete entries in directory whose names are not in keep."""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name in keep:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+
+def load_cache(cache_path, mtime_ns):
+    """Return data cached for mtime_ns, or None if the cache is missing or stale."""
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict):
+        return None
+    if cache.get("version") != _CACHE_VERSION or cache.get("mtime") != mtime_ns:
+        return None
+    return cache.get("data")
+
+def save_cache(cache_path, mtime_ns, data):
+    """Store data in cache_path tagged with mtime_ns; failures are ignored."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump({"version": _CACHE_VERSION, "mtime": mtime_ns, "data": data}, f)
+    except OSError:
+        pass
+
+def load_ppd_index(resources_dir, cache_path):
+    """Return {manufacturer: [driver, ...]}, cached against resources_dir's mtime."""
+    mtime_ns = os.stat(resources_dir).st_mtime_ns
+    by_mfr = load_cache(cache_path, mtime_ns)
+    if by_mfr is None:
+        by_mfr = scan_ppd_files(resources_dir)
+        save_cache(cache_path, mtime_ns, by_mfr)
+    return by_mfr
+
+def load_technician_map(filepath, default, cache_path):
+    """Return get_technician_map() for the names in filepath, cached against its mtime."""
+    try:
+        mtime_ns = os.stat(filepath).st_mtime_ns
+    except OSError:
+        return get_technician_map(default)
+    tech_map = load_cache(cache_path, mtime_ns)
+    if tech_map is None:
+        tech_map = get_technician_map(load_list_from_file(filepath, default))
+        save_cache(cache_path, mtime_ns, tech_map)
+    return tech_map
+
 # === Main Workflow ===
 
-def main():
-    # Technician selection
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Build a Pharos Popup printer DMG.")
+    parser.add_argument("--uncompressed", action="store_true",
+                        help="create a read-only uncompressed (UDRO) image instead of UDZO")
+    parser.add_argument("--clean", action="store_true",
+                        help="delete and recreate the /tmp staging folder instead of reusing it")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Check for Installer.pkg before walking the technician through the prompts
+    installer_src = os.path.expanduser("~/Downloads/PharosDMG/Installer.pkg")
+    if not os.path.isfile(installer_src):
+        print("❌ Installer.pkg not found in ~/Downloads/PharosDMG.")
+        show_error_dialog(
+            "Installer.pkg Missing",
+            "Installer.pkg was not found in ~/Downloads/PharosDMG. Download the latest Pharos Popup "
+            "and Notify Client package, save it there as Installer.pkg, and run this again."
+        )
+        return
+
+    # Read the option lists and the printer drivers concurrently; each is only
+    # waited on when its prompt comes up
     technicians_file = os.path.expanduser("~/Downloads/PharosDMG/technicians.txt")
-    technicians = load_list_from_file(technicians_file, ["Croucher, Mike", "Tian, Zhiyong"])
-    technician_map = get_technician_map(technicians)
+    technicians_cache_file = os.path.expanduser("~/Downloads/PharosDMG/.tech_cache.json")
+    packages_file = os.path.expanduser("~/Downloads/PharosDMG/packages.txt")
+    servers_file = os.path.expanduser("~/Downloads/PharosDMG/servers.txt")
+    resources_dir = "/Library/Printers/PPDs/Contents/Resources"
+    ppd_cache_file = os.path.expanduser("~/Downloads/PharosDMG/.ppd_cache.json")
+    executor = ThreadPoolExecutor(max_workers=4)
+    technicians_future = executor.submit(
+        load_technician_map, technicians_file, ["Croucher, Mike", "Tian, Zhiyong"], technicians_cache_file
+    )
+    packages_future = executor.submit(load_list_from_file, packages_file, [])
+    servers_future = executor.submit(load_list_from_file, servers_file, ["PS1.ohio.edu", "PS2.ohio.edu", "PSB.ohio.edu"])
+    ppd_future = executor.submit(load_ppd_index, resources_dir, ppd_cache_file)
+    executor.shutdown(wait=False)
+
+    # Technician selection
+    technician_map = technicians_future.result()
     technician_display_list = list(technician_map.keys())
     technician_display = prompt_with_list_or_custom("Technician", "Select your name:", technician_display_list)
     technician_full = technician_map.get(technician_display, technician_display)
@@ -96,44 +281,42 @@ def main():
             f"Also, ensure you have downloaded and saved the latest Pharos Popup and Notify Client package."
             f" to your ~/Downloads/PharosDMG folder. This file should be renamed to Installer.pkg."
         )
-        warning_script = f'display dialog "{warning_message}" with title "Driver Installation Required" buttons {{"OK"}} default button "OK"'
-        subprocess.run(['osascript', '-e', warning_script])
-
-    # Package selection
-    packages_file = os.path.expanduser("~/Downloads/PharosDMG/packages.txt")
-    packages = load_list_from_file(packages_file, [])
-    queue_name = prompt_with_list_or_custom("Queue", "Select the Pharos queue/package:", packages)
+        warning_script = f'display dialog {applescript_string(warning_message)} with title "Driver Installation Required" buttons {{"OK"}} default button "OK"'
+        run_applescript(warning_script)
+
+    # Package and server selection (one AppleScript run for both prompts)
+    packages = packages_future.result()
+    servers = servers_future.result()
+    queue_name, server = prompt_many_with_list_or_custom([
+        ("Queue", "Select the Pharos queue/package:", packages),
+        ("Server", "Select the print server:", servers),
+    ])
     if not queue_name:
         print("❌ No queue/package selected or entered.")
         return
 
-    base_queue = re.sub(r'\.dmg$', '', queue_name, flags=re.IGNORECASE)
-    bare_queue = extract_bare_queue(queue_name)
-    popup_name = f"{bare_queue}_Popup"
-
-    # Server selection
-    servers_file = os.path.expanduser("~/Downloads/PharosDMG/servers.txt")
-    servers = load_list_from_file(servers_file, ["PS1.ohio.edu", "PS2.ohio.edu", "PSB.ohio.edu"])
-    server = prompt_with_list_or_custom("Server", "Select the print server:", servers)
     if not server:
         print("❌ No server selected or entered.")
         return
 
+    base_queue = queue_name[:-4] if queue_name.lower().endswith('.dmg') else queue_name
+    bare_queue = extract_bare_queue(base_queue)
+    popup_name = f"{bare_queue}_Popup"
+
     # Manufacturer and driver selection
-    resources_dir = "/Library/Printers/PPDs/Contents/Resources"
     try:
-        ppd_files = sorted([f for f in os.listdir(resources_dir) if f.endswith(".gz")])
+        drivers_by_mfr = ppd_future.result()
     except Exception as e:
         print(f"❌ Could not list printer drivers: {e}")
         return
 
-    manufacturers = sorted(set(extract_manufacturer(f) for f in ppd_files))
+    manufacturers = sorted(drivers_by_mfr)
     manufacturer = prompt_with_list_or_custom("Manufacturer", "Select the printer manufacturer:", manufacturers)
     if not manufacturer:
         print("❌ No manufacturer selected or entered.")
         return
 
-    filtered_drivers = [f[:-3] for f in ppd_files if extract_manufacturer(f) == manufacturer]
+    filtered_drivers = drivers_by_mfr.get(manufacturer, [])
     selected_driver = prompt_with_list_or_custom("Driver", "Select the printer model:", filtered_drivers)
     if not selected_driver:
         print("❌ No driver selected or entered.")
@@ -154,23 +337,26 @@ def main():
     volume_name = base_queue
     temp_dir = f"/tmp/{volume_name}"
 
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
     custom_dir = os.path.join(temp_dir, "Custom")
+    if args.clean and os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
     os.makedirs(custom_dir, exist_ok=True)
+    # Files below are overwritten in place; drop anything else left from an
+    # earlier build (e.g. another driver's PPD) so it doesn't end up in the DMG
+    remove_stale_entries(temp_dir, {"Custom", "Installer.pkg"})
+    remove_stale_entries(custom_dir, {sanitized_driver_filename, "InstallFiles.txt", "PostInstall.sh"})
 
     # Copy and decompress PPD
     source_ppd_gz = os.path.join(resources_dir, selected_driver + ".gz")
     destination_ppd = os.path.join(custom_dir, sanitized_driver_filename)
     try:
-        with open(destination_ppd, "wb") as out_f:
-            subprocess.run(["gunzip", "-c", source_ppd_gz], stdout=out_f, check=True)
+        with gzip.open(source_ppd_gz, "rb") as src, open(destination_ppd, "wb") as dst:
+            shutil.copyfileobj(src, dst, length=64 * 1024)
     except Exception as e:
         print(f"❌ Could not decompress PPD: {e}")
         return
 
     # Copy Installer.pkg
-    installer_src = os.path.expanduser("~/Downloads/PharosDMG/Installer.pkg")
     installer_dst = os.path.join(temp_dir, "Installer.pkg")
     try:
         shutil.copy2(installer_src, installer_dst)
@@ -181,16 +367,20 @@ def main():
     # Create InstallFiles.txt
     install_txt_path = os.path.join(custom_dir, "InstallFiles.txt")
     with open(install_txt_path, "w") as f:
-        f.write("# PPD file need to be copied\n#\n")
-        f.write(f"# {technician_full} -- {current_date}\n#\n")
-        f.write(f"/etc/cups/ppd/{sanitized_driver_filename}\n")
+        f.write(
+            "# PPD file need to be copied\n#\n"
+            f"# {technician_full} -- {current_date}\n#\n"
+            f"/etc/cups/ppd/{sanitized_driver_filename}\n"
+        )
 
     # Create PostInstall.sh (use sanitized_driver_filename!)
     postinstall_path = os.path.join(custom_dir, "PostInstall.sh")
     with open(postinstall_path, "w") as f:
-        f.write("# Install print queue in CUPS\n#\n")
-        f.write(f"# {technician_full} -- {current_date}\n#\n")
-        f.write(f"lpadmin -p {popup_name} -v popup://{server}/{base_queue} -E -P {sanitized_driver_filename}\n")
+        f.write(
+            "# Install print queue in CUPS\n#\n"
+            f"# {technician_full} -- {current_date}\n#\n"
+            f"lpadmin -p {popup_name} -v popup://{server}/{base_queue} -E -P {sanitized_driver_filename}\n"
+        )
 
     # Create DMG
     output_dir = os.path.expanduser("~/Downloads/PharosDMG")
@@ -203,11 +393,14 @@ def main():
             print("❌ Operation cancelled by user.")
             return
 
+    # The payload is one PPD plus Installer.pkg, so zlib level 1 is nearly as
+    # small as the default level 6 and much faster to build
+    image_format = ["-format", "UDRO"] if args.uncompressed else ["-format", "UDZO", "-imagekey", "zlib-level=1"]
     try:
         subprocess.run([
             "hdiutil", "create", "-volname", volume_name,
             "-srcfolder", temp_dir,
-            "-ov", "-format", "UDZO", dmg_path
+            "-ov", *image_format, dmg_path
         ], check=True)
         print(f"✅ DMG created at: {dmg_path}")
     except Exception as e: